@@ -0,0 +1,456 @@
+from sqlalchemy import create_engine, inspect
+import psycopg2
+import pandas as pd
+import os
+import sys
+
+import numpy as np
+
+# user = "user"
+# password = "password"
+# host = "192.168.59.101"
+# port = "30432"
+# database = "football-db"
+
+# Database Configurations
+database = os.environ["database"]
+user = os.environ["user"]
+password = os.environ["password"]
+host = os.environ["host"]
+port = os.environ["port"]
+
+# Elo Configurations
+INITIAL_ELO = 1500.0
+K_FACTOR = 20.0
+HOME_ADVANTAGE = 60.0
+FORM_WINDOW = 5
+
+# Output tables
+MATCH_RATINGS_TABLE = "match_ratings"
+ELO_STATE_TABLE = "elo_ratings"
+
+
+def parse_matches(scores_and_fixtures):
+    """
+    Parses the scores_and_fixtures table into one row per played match.
+    Score and xG columns are parsed with vectorised string operations and
+    fixtures without a score (not yet played) are dropped.
+
+    Args:
+        scores_and_fixtures (pd.DataFrame): scores_and_fixtures table as loaded by job.py.
+
+    Returns:
+        pd.DataFrame: Played matches sorted in date order with the columns
+        date, home, away, home_goals, away_goals, home_xg and away_xg.
+    """
+    df = scores_and_fixtures.dropna(subset=["home", "away", "score"])
+
+    # Scores look like "2–1" (en dash), cup ties may carry penalties "(4) 1–1 (3)"
+    goals = df["score"].astype(str).str.extract(r"(\d+)\s*[–-]\s*(\d+)")
+
+    matches = pd.DataFrame(
+        {
+            "date": pd.to_datetime(df["date"], errors="coerce"),
+            "time": df["time"].astype(str) if "time" in df.columns else "",
+            "home": df["home"].astype(str).str.strip().str.lower(),
+            "away": df["away"].astype(str).str.strip().str.lower(),
+            "home_goals": pd.to_numeric(goals[0], errors="coerce"),
+            "away_goals": pd.to_numeric(goals[1], errors="coerce"),
+            "home_xg": pd.to_numeric(df["xg"], errors="coerce"),
+            "away_xg": pd.to_numeric(df["xg.1"], errors="coerce"),
+        }
+    )
+    matches = matches.dropna(subset=["date", "home_goals", "away_goals"])
+    matches[["home_goals", "away_goals"]] = matches[
+        ["home_goals", "away_goals"]
+    ].astype("int64")
+
+    return matches.sort_values(["date", "time"], kind="mergesort").reset_index(
+        drop=True
+    )
+
+
+def match_batches(matches):
+    """
+    Groups matches into batches that can be rated at the same time. A batch
+    holds the matches of one date in which no squad appears twice, so every
+    squad's ratings are updated in the same order as the matches were played.
+
+    Args:
+        matches (pd.DataFrame): Played matches sorted in date order.
+
+    Returns:
+        tuple(pd.DataFrame, np.ndarray): Matches reordered by batch, and the start
+        offset of each batch followed by the total match count.
+    """
+    date_code = pd.factorize(matches["date"], sort=True)[0]
+    match_id = np.arange(len(matches))
+
+    # One row per squad per match, home and away appearances stacked together
+    appearances = pd.DataFrame(
+        {
+            "match": np.concatenate([match_id, match_id]),
+            "date": np.concatenate([date_code, date_code]),
+            "squad": np.concatenate([matches["home"], matches["away"]]),
+        }
+    ).sort_values(["date", "squad", "match"], kind="mergesort")
+    keys = [appearances["date"], appearances["squad"]]
+    appearance_match = appearances["match"].to_numpy()
+
+    # A match must go in a later batch than every earlier match of both its
+    # squads on that date, repeat until every squad's chain of matches agrees
+    repeat = np.zeros(len(matches), dtype="int64")
+    while True:
+        latest = (
+            pd.Series(repeat[appearance_match], index=appearances.index)
+            .groupby(keys)
+            .cummax()
+        )
+        required = latest.groupby(keys).shift(1).fillna(-1).to_numpy() + 1
+
+        new_repeat = repeat.copy()
+        np.maximum.at(new_repeat, appearance_match, required.astype("int64"))
+        if np.array_equal(new_repeat, repeat):
+            break
+        repeat = new_repeat
+
+    order = np.lexsort((match_id, repeat, date_code))
+    matches = matches.iloc[order].reset_index(drop=True)
+    date_code, repeat = date_code[order], repeat[order]
+
+    changes = np.flatnonzero((np.diff(date_code) != 0) | (np.diff(repeat) != 0)) + 1
+    bounds = np.concatenate(([0], changes, [len(matches)]))
+
+    return matches, bounds
+
+
+def calculate_elo(matches, state=None):
+    """
+    Calculates the Elo ratings of both squads before and after each match.
+    Ratings live in a NumPy array indexed by squad id and are updated one
+    batch of matches at a time rather than one row at a time.
+
+    Args:
+        matches (pd.DataFrame): Played matches sorted in date order.
+        state (pd.DataFrame, optional): Stored elo_ratings table to resume from.
+
+            Defaults to None, in which case every squad starts at INITIAL_ELO.
+
+    Returns:
+        tuple(pd.DataFrame, pd.DataFrame): Matches with the elo_pre and elo_post
+        columns of both squads, and the new elo_ratings state.
+    """
+    if state is None:
+        state = pd.DataFrame(
+            {"squad": [], "elo": [], "matches_played": [], "last_match": []}
+        )
+
+    # Squad ids: squads already in the state keep their position
+    squads = pd.Index(state["squad"]).append(
+        pd.Index(matches["home"]).append(pd.Index(matches["away"]))
+    )
+    squads = squads.drop_duplicates()
+    ratings = np.full(len(squads), INITIAL_ELO)
+    ratings[: len(state)] = state["elo"].to_numpy(dtype="float64")
+    played = np.zeros(len(squads), dtype="int64")
+    played[: len(state)] = state["matches_played"].to_numpy(dtype="int64")
+
+    matches, bounds = match_batches(matches)
+    home_id = squads.get_indexer(matches["home"])
+    away_id = squads.get_indexer(matches["away"])
+
+    home_goals = matches["home_goals"].to_numpy()
+    away_goals = matches["away_goals"].to_numpy()
+    result = np.sign(home_goals - away_goals) * 0.5 + 0.5
+    margin = np.log1p(np.abs(home_goals - away_goals)) + 1
+
+    home_pre = np.empty(len(matches))
+    away_pre = np.empty(len(matches))
+    delta = np.empty(len(matches))
+
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        home = home_id[start:stop]
+        away = away_id[start:stop]
+        home_pre[start:stop] = ratings[home]
+        away_pre[start:stop] = ratings[away]
+
+        expected = 1 / (
+            1 + 10 ** ((ratings[away] - ratings[home] - HOME_ADVANTAGE) / 400)
+        )
+        change = K_FACTOR * margin[start:stop] * (result[start:stop] - expected)
+        delta[start:stop] = change
+
+        # No squad appears twice in a batch so fancy-indexed updates are safe
+        ratings[home] += change
+        ratings[away] -= change
+
+    np.add.at(played, home_id, 1)
+    np.add.at(played, away_id, 1)
+
+    matches["home_elo_pre"] = home_pre
+    matches["away_elo_pre"] = away_pre
+    matches["home_elo_post"] = home_pre + delta
+    matches["away_elo_post"] = away_pre - delta
+
+    last_match = pd.concat(
+        [
+            matches[["home", "date"]].rename(columns={"home": "squad"}),
+            matches[["away", "date"]].rename(columns={"away": "squad"}),
+            state[["squad", "last_match"]].rename(columns={"last_match": "date"}),
+        ]
+    )
+    last_match["date"] = pd.to_datetime(last_match["date"])
+    last_match = last_match.groupby("squad")["date"].max()
+
+    new_state = pd.DataFrame(
+        {"squad": squads, "elo": ratings, "matches_played": played}
+    )
+    new_state["last_match"] = new_state["squad"].map(last_match)
+
+    return matches, new_state
+
+
+def to_team_matches(matches):
+    """
+    Reshapes rated matches into one row per squad per match.
+
+    Args:
+        matches (pd.DataFrame): Matches returned by calculate_elo.
+
+    Returns:
+        pd.DataFrame: Rows with the squad, opponent, venue, goals, xG, points and Elo of each side.
+    """
+    sides = []
+    for venue, side, other in [("home", "home", "away"), ("away", "away", "home")]:
+        team = pd.DataFrame(
+            {
+                "date": matches["date"],
+                "squad": matches[side],
+                "opponent": matches[other],
+                "venue": venue,
+                "gf": matches[f"{side}_goals"],
+                "ga": matches[f"{other}_goals"],
+                "xgf": matches[f"{side}_xg"],
+                "xga": matches[f"{other}_xg"],
+                "elo_pre": matches[f"{side}_elo_pre"],
+                "elo_post": matches[f"{side}_elo_post"],
+            }
+        )
+        sides.append(team)
+
+    team_matches = pd.concat(sides, ignore_index=True)
+    team_matches["points"] = np.select(
+        [
+            team_matches["gf"] > team_matches["ga"],
+            team_matches["gf"] == team_matches["ga"],
+        ],
+        [3, 1],
+        default=0,
+    )
+    return team_matches.sort_values(["date", "squad"], kind="mergesort").reset_index(
+        drop=True
+    )
+
+
+def calculate_form(team_matches, history=None, window=FORM_WINDOW):
+    """
+    Calculates each squad's rolling form over its last `window` matches,
+    including the match itself.
+
+    Args:
+        team_matches (pd.DataFrame): New rows returned by to_team_matches.
+        history (pd.DataFrame, optional): Each squad's most recent stored
+            match_ratings rows, needed to continue the window in incremental mode.
+
+            Defaults to None.
+
+        window (int, optional): Number of matches in the form window. Defaults to FORM_WINDOW.
+
+    Returns:
+        pd.DataFrame: team_matches with the form_points and form_xg_diff columns.
+    """
+    team_matches = team_matches.copy()
+    team_matches["is_new"] = True
+    team_matches["xg_diff"] = team_matches["xgf"] - team_matches["xga"]
+
+    combined = team_matches
+    if history is not None and len(history):
+        history = history.copy()
+        history["date"] = pd.to_datetime(history["date"])
+        history["is_new"] = False
+        history["xg_diff"] = history["xgf"] - history["xga"]
+        combined = pd.concat([history, team_matches], ignore_index=True)
+
+    combined = combined.sort_values(
+        ["squad", "date", "is_new"], kind="mergesort"
+    ).reset_index(drop=True)
+    rolling = (
+        combined.groupby("squad")[["points", "xg_diff"]]
+        .rolling(window, min_periods=1)
+        .sum()
+        .reset_index(level=0, drop=True)
+    )
+    combined["form_points"] = rolling["points"]
+    combined["form_xg_diff"] = rolling["xg_diff"]
+
+    combined = combined[combined["is_new"]].drop(columns=["is_new", "xg_diff"])
+    return combined.sort_values(["date", "squad"], kind="mergesort").reset_index(
+        drop=True
+    )
+
+
+def pushRatingsToDB(team_matches, state, conn, full):
+    """
+    Pushes the rated matches and the new Elo state in a single transaction,
+    so a match is only marked as rated once its Elo change is stored.
+
+    Args:
+        team_matches (pd.DataFrame): Rated matches returned by calculate_form.
+        state (pd.DataFrame): New elo_ratings state returned by calculate_elo.
+        conn (sqlalchemy.engine.base.Connection): Connection engine to the database.
+        full (bool): Replace the stored match ratings instead of appending to them.
+    """
+
+    # Begin a transaction
+    transaction = conn.begin()
+
+    try:
+        # Push both DataFrames to PostgreSQL
+        team_matches.to_sql(
+            name=MATCH_RATINGS_TABLE,
+            con=conn,
+            if_exists="replace" if full else "append",
+            index=False,
+        )
+        state.to_sql(name=ELO_STATE_TABLE, con=conn, if_exists="replace", index=False)
+
+        # Commit the transaction
+        transaction.commit()
+        print(
+            f"{MATCH_RATINGS_TABLE} and {ELO_STATE_TABLE} have been successfully committed."
+        )
+
+    except Exception as e:
+        # Rollback the transaction if there's an error
+        transaction.rollback()
+
+        print(
+            f"Error occurred in uploading {MATCH_RATINGS_TABLE} and {ELO_STATE_TABLE}. "
+            "Transaction has been rolled back."
+        )
+        print(f"Error message: {str(e)}")
+        raise (e)
+
+
+def get_scores_and_fixtures(conn):
+    """
+    Get the scores_and_fixtures table loaded by job.py.
+
+    Args:
+        conn (sqlalchemy.engine.base.Engine.Connection): Connection to the postgres DB.
+
+    Returns:
+        pd.DataFrame: scores_and_fixtures data.
+    """
+    return pd.read_sql_query(sql="SELECT * FROM scores_and_fixtures", con=conn)
+
+
+def get_stored_state(conn, window=FORM_WINDOW):
+    """
+    Get the stored Elo state, the keys of the matches already rated and
+    each squad's last `window` rated matches.
+
+    Args:
+        conn (sqlalchemy.engine.base.Engine.Connection): Connection to the postgres DB.
+        window (int, optional): Number of matches in the form window. Defaults to FORM_WINDOW.
+
+    Returns:
+        tuple(pd.DataFrame, pd.DataFrame, pd.DataFrame): elo_ratings state, rated
+        match keys and form history. All three are None if neither table exists yet.
+    """
+    if not any(
+        inspect(conn).has_table(table)
+        for table in [ELO_STATE_TABLE, MATCH_RATINGS_TABLE]
+    ):
+        print("No stored Elo state found, recomputing the full history....")
+        return None, None, None
+
+    state = pd.read_sql_query(sql=f"SELECT * FROM {ELO_STATE_TABLE}", con=conn)
+    rated = pd.read_sql_query(
+        sql=f"""SELECT date, squad AS home, opponent AS away FROM {MATCH_RATINGS_TABLE}
+                WHERE venue = 'home' """,
+        con=conn,
+    )
+    history = pd.read_sql_query(
+        sql=f"""SELECT date, squad, points, xgf, xga FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY squad ORDER BY date DESC) AS rn
+                    FROM {MATCH_RATINGS_TABLE}) AS t1
+                WHERE rn <= {int(window)} """,
+        con=conn,
+    )
+
+    return state, rated, history
+
+
+def unrated_matches(matches, rated):
+    """
+    Filters out the matches that have already been rated.
+
+    Args:
+        matches (pd.DataFrame): Played matches returned by parse_matches.
+        rated (pd.DataFrame): date, home and away of the matches already rated.
+
+    Returns:
+        pd.DataFrame: Matches that have not been rated yet.
+    """
+    rated = rated.assign(date=pd.to_datetime(rated["date"]), rated=True)
+    merged = matches.merge(rated, on=["date", "home", "away"], how="left")
+    return merged[merged["rated"].isna()].drop(columns=["rated"]).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    # Full recompute with --full, otherwise resume from the stored state.
+    # scores_and_fixtures only holds the current season, so --full replaces the
+    # stored ratings of every earlier season and restarts every squad at INITIAL_ELO.
+    full = "--full" in sys.argv[1:]
+
+    # Connect to DB
+    try:
+        print("Establishing Connection with DB....")
+        db = create_engine(f"postgresql://{user}:{password}@{host}:{port}/{database}")
+        conn = db.connect()
+        print("Successfully Established Connection with DB....")
+
+    except Exception as e:
+        print("Unable to Establish Connection with DB....")
+        raise (e)
+
+    print("Getting Scores and Fixtures Data...")
+    matches = parse_matches(get_scores_and_fixtures(conn=conn))
+
+    state, rated, history = (None, None, None)
+    if not full:
+        state, rated, history = get_stored_state(conn=conn)
+        full = state is None
+
+    if not full:
+        matches = unrated_matches(matches=matches, rated=rated)
+        print(f"Found {len(matches)} new matches to rate...")
+
+    if len(matches) == 0:
+        print("Elo Ratings Already Up To Date....")
+
+    else:
+        print("Calculating Elo and Form Ratings...")
+        matches, state = calculate_elo(matches=matches, state=state)
+        team_matches = calculate_form(
+            team_matches=to_team_matches(matches=matches), history=history
+        )
+
+        # Pushing to DB
+        pushRatingsToDB(team_matches=team_matches, state=state, conn=conn, full=full)
+
+        print("Elo Ratings Successfully Loaded....")
+
+    # Close the connection
+    conn.close()
@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+import pandas as pd
+
+# Kickoff times on FBRef are local to the venue
+FIXTURES_TIMEZONE = "Europe/London"
+
+# Time from kickoff until the result is on FBRef (90 minutes, half time and stoppage time)
+FULL_TIME_DELAY = timedelta(minutes=125)
+
+# How far back to keep retrying matches whose result is not on FBRef yet
+RESULT_LOOKBACK = timedelta(days=3)
+
+# How often to reload the fixture list when no match has finished, picking up
+# moved fixtures and the next season's fixtures once the current one has ended
+FIXTURES_MAX_AGE = timedelta(days=1)
+
+
+def get_full_time(fixtures):
+    """
+    Calculates when each fixture reaches full time from its kickoff date and time.
+    Times like "17:30 (18:30)" keep the first (venue local) time.
+
+    Args:
+        fixtures (pd.DataFrame): scores_and_fixtures table as loaded by job.py.
+
+    Returns:
+        pd.Series: Timezone aware full time of each fixture, NaT if it cannot be parsed.
+    """
+    kickoff = pd.to_datetime(
+        fixtures["date"].astype(str)
+        + " "
+        + fixtures["time"].astype(str).str.extract(r"(\d{1,2}:\d{2})")[0],
+        errors="coerce",
+    )
+    return (
+        kickoff.dt.tz_localize(FIXTURES_TIMEZONE, ambiguous="NaT", nonexistent="NaT")
+        + FULL_TIME_DELAY
+    )
+
+
+def select_squads(fixtures, now):
+    """
+    Selects the squads to refresh from the stored scores_and_fixtures table.
+    Matches that have reached full time but have no score yet stay selected
+    on every check until their result has been loaded.
+
+    Args:
+        fixtures (pd.DataFrame): scores_and_fixtures table as loaded by job.py.
+        now (pd.Timestamp): Timezone aware time of the check.
+
+    Returns:
+        str: Comma separated squads that played, "all" if the fixtures have not
+        been loaded within FIXTURES_MAX_AGE, or an empty string if no match finished.
+    """
+    # Reload everything once the stored fixture list is stale
+    if (
+        "loaded_at" not in fixtures.columns
+        or pd.to_datetime(fixtures["loaded_at"], utc=True).max()
+        <= now - FIXTURES_MAX_AGE
+    ):
+        return "all"
+
+    fixtures = fixtures.dropna(subset=["date", "time", "home", "away"])
+    full_time = get_full_time(fixtures)
+
+    # Postponed or cancelled matches never get a score and carry a note instead
+    finished = fixtures[
+        (full_time <= now)
+        & (full_time > now - RESULT_LOOKBACK)
+        & fixtures["score"].isna()
+        & fixtures["notes"].isna()
+    ]
+    squads = sorted(
+        set(finished["home"].str.lower()) | set(finished["away"].str.lower())
+    )
+
+    return ",".join(squads)
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text, bindparam
 import psycopg2
 import os
 import pandas as pd
@@ -16,6 +16,15 @@ password = os.environ["password"]
 host = os.environ["host"]
 port = os.environ["port"]
 
+# Squads whose matches have just finished, set by the DAG as a comma separated list.
+# Empty, "all" or "None" (nothing pulled from XCom) refreshes the stats of every squad.
+squads = os.environ.get("squads", "all")
+squads = (
+    []
+    if squads.strip() in ["", "all", "None"]
+    else [squad.strip() for squad in squads.split(",")]
+)
+
 # database = "football-db"
 # user = "user"
 # password = "password"
@@ -174,188 +183,286 @@ def pushToDB(table_name, df, conn, if_exists="replace", index=False):
         raise (e)
 
 
-print("Data Extract Phase Started....")
-
-raw_scores_and_fixtures = pd.read_html(PL_SCORES_FIXTURES_URL)[0]
-
-all_tables = pd.read_html(PL_STATS_URL)
-
-raw_regular_season_overall = all_tables[0]
-raw_regular_season_home_away = all_tables[1]
-
-raw_squad_standard_stats_squad = all_tables[2]
-raw_squad_standard_stats_opponent = all_tables[3]
-
-raw_squad_goalkeeping_squad = all_tables[4]
-raw_squad_goalkeeping_opponent = all_tables[5]
-
-raw_squad_advanced_goalkeeping_squad = all_tables[6]
-raw_squad_advanced_goalkeeping_opponent = all_tables[7]
-
-raw_squad_shooting_squad = all_tables[8]
-raw_squad_shooting_opponent = all_tables[9]
-
-raw_squad_passing_squad = all_tables[10]
-raw_squad_passing_opponent = all_tables[11]
-
-raw_squad_pass_types_squad = all_tables[12]
-raw_squad_pass_types_opponent = all_tables[13]
-
-raw_squad_goal_shot_creation_squad = all_tables[14]
-raw_squad_goal_shot_creation_opponent = all_tables[15]
-
-raw_squad_defensive_actions_squad = all_tables[16]
-raw_squad_defensive_actions_opponent = all_tables[17]
-
-raw_squad_possession_squad = all_tables[18]
-raw_squad_possession_opponent = all_tables[19]
-
-raw_squad_playing_time_squad = all_tables[20]
-raw_squad_playing_time_opponent = all_tables[21]
-
-raw_squad_miscellaneous_stats_squad = all_tables[22]
-raw_squad_miscellaneous_stats_opponent = all_tables[23]
-
-print("Data Extract Phase Ended....")
+def pushSquadsToDB(table_name, df, conn, squads):
+    """
+    Replaces only the rows of the given squads in a table, leaving the other
+    squads' rows untouched. Pushes every squad when no squads are given, any
+    of them has no rows in the DataFrame, or the table does not exist yet.
 
-print("Data Transformation Phase Started....")
+    Args:
+        table_name (str): Name of the resulting table in database.
+        df (pd.DataFrame): DataFrame to uploaded to database.
+        conn (sqlalchemy.engine.base.Connection): Connection engine to the database.
+        squads (list): Lower case names of the squads to refresh.
+    """
 
-print("Regular Season Transformations....")
-raw_regular_season_home_away = flatten_df(raw_regular_season_home_away.copy())
-raw_regular_season_overall.columns = [
-    "Overall_" + i.strip().replace(" ", "") if i not in ["Rk", "Squad"] else i
-    for i in raw_regular_season_overall.columns
-]
-regular_season = raw_regular_season_overall.merge(
-    right=raw_regular_season_home_away,
-    how="inner",
-    on=["Rk", "Squad"],
-    validate="one_to_one",
-)
+    if not squads:
+        pushToDB(table_name=table_name, df=df, conn=conn)
+        return
 
-print("Standard Stats Transformations....")
-standard_stats = transform_combine(
-    raw_squad_df=raw_squad_standard_stats_squad.copy(),
-    raw_opponent_df=raw_squad_standard_stats_opponent.copy(),
-)
+    df = clean_column_names(df.copy())
+    squad_df = df[df["squad"].isin(squads)]
 
-print("Goalkeeping Stats Transformations....")
-goalkeeping_stats = transform_combine(
-    raw_squad_df=raw_squad_goalkeeping_squad.copy(),
-    raw_opponent_df=raw_squad_goalkeeping_opponent.copy(),
-)
+    # Squad names come from the fixtures, refresh everything if any is not in the stats
+    missing = sorted(set(squads) - set(squad_df["squad"]))
+    if missing:
+        print(f"Warning: no rows in {table_name} for {missing}, replacing all squads.")
+        pushToDB(table_name=table_name, df=df, conn=conn)
+        return
 
-print("Advanced Goalkeeping Stats Transformations....")
-advanced_goalkeeping_stats = transform_combine(
-    raw_squad_df=raw_squad_advanced_goalkeeping_squad.copy(),
-    raw_opponent_df=raw_squad_advanced_goalkeeping_opponent.copy(),
-)
+    # Begin a transaction
+    transaction = conn.begin()
 
-print("Shooting Stats Transformations....")
-shooting_stats = transform_combine(
-    raw_squad_df=raw_squad_shooting_squad.copy(),
-    raw_opponent_df=raw_squad_shooting_opponent.copy(),
-)
+    try:
+        if inspect(conn).has_table(table_name):
+            # Delete the stale rows of the squads and push their new rows
+            conn.execute(
+                text(f"DELETE FROM {table_name} WHERE squad IN :squads").bindparams(
+                    bindparam("squads", expanding=True)
+                ),
+                {"squads": squads},
+            )
+            squad_df.to_sql(name=table_name, con=conn, if_exists="append", index=False)
+        else:
+            # First load of the table, push every squad
+            df.to_sql(name=table_name, con=conn, if_exists="append", index=False)
 
-print("Passing Stats Transformations....")
-passing_stats = transform_combine(
-    raw_squad_df=raw_squad_passing_squad.copy(),
-    raw_opponent_df=raw_squad_passing_opponent.copy(),
-)
+        # Commit the transaction
+        transaction.commit()
+        print(f"{table_name} has been successfully committed for {squads}.")
 
-print("Passing Types Stats Transformations....")
-passing_types_stats = transform_combine(
-    raw_squad_df=raw_squad_pass_types_squad.copy(),
-    raw_opponent_df=raw_squad_pass_types_opponent.copy(),
-)
+    except Exception as e:
+        # Rollback the transaction if there's an error
+        transaction.rollback()
 
-print("Goal Shot Creation Stats Transformations....")
-goal_shot_creation_stats = transform_combine(
-    raw_squad_df=raw_squad_goal_shot_creation_squad.copy(),
-    raw_opponent_df=raw_squad_goal_shot_creation_opponent.copy(),
-)
+        print(
+            f"Error occurred in uploading {table_name}. Transaction has been rolled back."
+        )
+        print(f"Error message: {str(e)}")
+        raise (e)
 
-print("Defensive Action Stats Transformations....")
-defensive_action_stats = transform_combine(
-    raw_squad_df=raw_squad_defensive_actions_squad.copy(),
-    raw_opponent_df=raw_squad_defensive_actions_opponent.copy(),
-)
 
-print("Posession Stats Transformations....")
-possession_stats = transform_combine(
-    raw_squad_df=raw_squad_possession_squad.copy(),
-    raw_opponent_df=raw_squad_possession_opponent.copy(),
-)
+if __name__ == "__main__":
+    print("Data Extract Phase Started....")
 
-print("Playing Time Stats Transformations....")
-playing_time_stats = transform_combine(
-    raw_squad_df=raw_squad_playing_time_squad.copy(),
-    raw_opponent_df=raw_squad_playing_time_opponent.copy(),
-)
+    raw_scores_and_fixtures = pd.read_html(PL_SCORES_FIXTURES_URL)[0]
 
-print("Miscellaneous Stats Transformations....")
-miscellaneous_stats = transform_combine(
-    raw_squad_df=raw_squad_miscellaneous_stats_squad.copy(),
-    raw_opponent_df=raw_squad_miscellaneous_stats_opponent.copy(),
-)
+    all_tables = pd.read_html(PL_STATS_URL)
 
-print("Data Transformation Phase Ended....")
+    raw_regular_season_overall = all_tables[0]
+    raw_regular_season_home_away = all_tables[1]
 
-try:
-    print("Establishing Connection with DB....")
-    db = create_engine(f"postgresql://{user}:{password}@{host}:{port}/{database}")
-    conn = db.connect()
-    print("Successfully Established Connection with DB....")
+    raw_squad_standard_stats_squad = all_tables[2]
+    raw_squad_standard_stats_opponent = all_tables[3]
 
-except Exception as e:
-    print("Unable to Establish Connection with DB....")
-    raise (e)
+    raw_squad_goalkeeping_squad = all_tables[4]
+    raw_squad_goalkeeping_opponent = all_tables[5]
 
+    raw_squad_advanced_goalkeeping_squad = all_tables[6]
+    raw_squad_advanced_goalkeeping_opponent = all_tables[7]
+
+    raw_squad_shooting_squad = all_tables[8]
+    raw_squad_shooting_opponent = all_tables[9]
+
+    raw_squad_passing_squad = all_tables[10]
+    raw_squad_passing_opponent = all_tables[11]
+
+    raw_squad_pass_types_squad = all_tables[12]
+    raw_squad_pass_types_opponent = all_tables[13]
+
+    raw_squad_goal_shot_creation_squad = all_tables[14]
+    raw_squad_goal_shot_creation_opponent = all_tables[15]
+
+    raw_squad_defensive_actions_squad = all_tables[16]
+    raw_squad_defensive_actions_opponent = all_tables[17]
 
-print("Data Loading Phase Started....")
+    raw_squad_possession_squad = all_tables[18]
+    raw_squad_possession_opponent = all_tables[19]
 
-# Creating/Updating the regular_season table  in the football-db database
-pushToDB(table_name="regular_season", df=regular_season, conn=conn)
+    raw_squad_playing_time_squad = all_tables[20]
+    raw_squad_playing_time_opponent = all_tables[21]
 
-# Creating/Updating the standard_stats table  in the football-db database
-pushToDB(table_name="standard_stats", df=standard_stats, conn=conn)
+    raw_squad_miscellaneous_stats_squad = all_tables[22]
+    raw_squad_miscellaneous_stats_opponent = all_tables[23]
 
-# Creating/Updating the goalkeeping_stats table  in the football-db database
-pushToDB(table_name="goalkeeping_stats", df=goalkeeping_stats, conn=conn)
+    print("Data Extract Phase Ended....")
 
-# Creating/Updating the advanced_goalkeeping_stats table  in the football-db database
-pushToDB(
-    table_name="advanced_goalkeeping_stats", df=advanced_goalkeeping_stats, conn=conn
-)
+    print("Data Transformation Phase Started....")
 
-# Creating/Updating the shooting_stats table  in the football-db database
-pushToDB(table_name="shooting_stats", df=shooting_stats, conn=conn)
+    print("Regular Season Transformations....")
+    raw_regular_season_home_away = flatten_df(raw_regular_season_home_away.copy())
+    raw_regular_season_overall.columns = [
+        "Overall_" + i.strip().replace(" ", "") if i not in ["Rk", "Squad"] else i
+        for i in raw_regular_season_overall.columns
+    ]
+    regular_season = raw_regular_season_overall.merge(
+        right=raw_regular_season_home_away,
+        how="inner",
+        on=["Rk", "Squad"],
+        validate="one_to_one",
+    )
 
-# Creating/Updating the passing_stats table  in the football-db database
-pushToDB(table_name="passing_stats", df=passing_stats, conn=conn)
+    print("Standard Stats Transformations....")
+    standard_stats = transform_combine(
+        raw_squad_df=raw_squad_standard_stats_squad.copy(),
+        raw_opponent_df=raw_squad_standard_stats_opponent.copy(),
+    )
 
-# Creating/Updating the passing_types_stats table  in the football-db database
-pushToDB(table_name="passing_types_stats", df=passing_types_stats, conn=conn)
+    print("Goalkeeping Stats Transformations....")
+    goalkeeping_stats = transform_combine(
+        raw_squad_df=raw_squad_goalkeeping_squad.copy(),
+        raw_opponent_df=raw_squad_goalkeeping_opponent.copy(),
+    )
 
-# Creating/Updating the goal_shot_creation_stats table  in the football-db database
-pushToDB(table_name="goal_shot_creation_stats", df=goal_shot_creation_stats, conn=conn)
+    print("Advanced Goalkeeping Stats Transformations....")
+    advanced_goalkeeping_stats = transform_combine(
+        raw_squad_df=raw_squad_advanced_goalkeeping_squad.copy(),
+        raw_opponent_df=raw_squad_advanced_goalkeeping_opponent.copy(),
+    )
 
-# Creating/Updating the defensive_action_stats table  in the football-db database
-pushToDB(table_name="defensive_action_stats", df=defensive_action_stats, conn=conn)
+    print("Shooting Stats Transformations....")
+    shooting_stats = transform_combine(
+        raw_squad_df=raw_squad_shooting_squad.copy(),
+        raw_opponent_df=raw_squad_shooting_opponent.copy(),
+    )
 
-# Creating/Updating the possession_stats table  in the football-db database
-pushToDB(table_name="possession_stats", df=possession_stats, conn=conn)
+    print("Passing Stats Transformations....")
+    passing_stats = transform_combine(
+        raw_squad_df=raw_squad_passing_squad.copy(),
+        raw_opponent_df=raw_squad_passing_opponent.copy(),
+    )
 
-# Creating/Updating the playing_time_stats table  in the football-db database
-pushToDB(table_name="playing_time_stats", df=playing_time_stats, conn=conn)
+    print("Passing Types Stats Transformations....")
+    passing_types_stats = transform_combine(
+        raw_squad_df=raw_squad_pass_types_squad.copy(),
+        raw_opponent_df=raw_squad_pass_types_opponent.copy(),
+    )
 
-# Creating/Updating the miscellaneous_stats table  in the football-db database
-pushToDB(table_name="miscellaneous_stats", df=miscellaneous_stats, conn=conn)
+    print("Goal Shot Creation Stats Transformations....")
+    goal_shot_creation_stats = transform_combine(
+        raw_squad_df=raw_squad_goal_shot_creation_squad.copy(),
+        raw_opponent_df=raw_squad_goal_shot_creation_opponent.copy(),
+    )
+
+    print("Defensive Action Stats Transformations....")
+    defensive_action_stats = transform_combine(
+        raw_squad_df=raw_squad_defensive_actions_squad.copy(),
+        raw_opponent_df=raw_squad_defensive_actions_opponent.copy(),
+    )
+
+    print("Posession Stats Transformations....")
+    possession_stats = transform_combine(
+        raw_squad_df=raw_squad_possession_squad.copy(),
+        raw_opponent_df=raw_squad_possession_opponent.copy(),
+    )
+
+    print("Playing Time Stats Transformations....")
+    playing_time_stats = transform_combine(
+        raw_squad_df=raw_squad_playing_time_squad.copy(),
+        raw_opponent_df=raw_squad_playing_time_opponent.copy(),
+    )
+
+    print("Miscellaneous Stats Transformations....")
+    miscellaneous_stats = transform_combine(
+        raw_squad_df=raw_squad_miscellaneous_stats_squad.copy(),
+        raw_opponent_df=raw_squad_miscellaneous_stats_opponent.copy(),
+    )
+
+    print("Scores and Fixtures Transformations....")
+    # Load time lets the DAG refresh the fixture list even when no match has finished
+    raw_scores_and_fixtures.loc[:, "loaded_at"] = pd.Timestamp.now(tz="UTC")
+
+    print("Data Transformation Phase Ended....")
 
-# Creating/Updating the scores_and_fixtures table  in the football-db database
-pushToDB(table_name="scores_and_fixtures", df=raw_scores_and_fixtures, conn=conn)
+    try:
+        print("Establishing Connection with DB....")
+        db = create_engine(f"postgresql://{user}:{password}@{host}:{port}/{database}")
+        conn = db.connect()
+        print("Successfully Established Connection with DB....")
 
-# Close the connection
-conn.close()
+    except Exception as e:
+        print("Unable to Establish Connection with DB....")
+        raise (e)
 
-print("Data Loading Phase Ended....")
+    print("Data Loading Phase Started....")
+
+    # Creating/Updating the regular_season table  in the football-db database
+    pushToDB(table_name="regular_season", df=regular_season, conn=conn)
+
+    # Creating/Updating the standard_stats table  in the football-db database
+    pushSquadsToDB(
+        table_name="standard_stats", df=standard_stats, conn=conn, squads=squads
+    )
+
+    # Creating/Updating the goalkeeping_stats table  in the football-db database
+    pushSquadsToDB(
+        table_name="goalkeeping_stats", df=goalkeeping_stats, conn=conn, squads=squads
+    )
+
+    # Creating/Updating the advanced_goalkeeping_stats table  in the football-db database
+    pushSquadsToDB(
+        table_name="advanced_goalkeeping_stats",
+        df=advanced_goalkeeping_stats,
+        conn=conn,
+        squads=squads,
+    )
+
+    # Creating/Updating the shooting_stats table  in the football-db database
+    pushSquadsToDB(
+        table_name="shooting_stats", df=shooting_stats, conn=conn, squads=squads
+    )
+
+    # Creating/Updating the passing_stats table  in the football-db database
+    pushSquadsToDB(
+        table_name="passing_stats", df=passing_stats, conn=conn, squads=squads
+    )
+
+    # Creating/Updating the passing_types_stats table  in the football-db database
+    pushSquadsToDB(
+        table_name="passing_types_stats",
+        df=passing_types_stats,
+        conn=conn,
+        squads=squads,
+    )
+
+    # Creating/Updating the goal_shot_creation_stats table  in the football-db database
+    pushSquadsToDB(
+        table_name="goal_shot_creation_stats",
+        df=goal_shot_creation_stats,
+        conn=conn,
+        squads=squads,
+    )
+
+    # Creating/Updating the defensive_action_stats table  in the football-db database
+    pushSquadsToDB(
+        table_name="defensive_action_stats",
+        df=defensive_action_stats,
+        conn=conn,
+        squads=squads,
+    )
+
+    # Creating/Updating the possession_stats table  in the football-db database
+    pushSquadsToDB(
+        table_name="possession_stats", df=possession_stats, conn=conn, squads=squads
+    )
+
+    # Creating/Updating the playing_time_stats table  in the football-db database
+    pushSquadsToDB(
+        table_name="playing_time_stats", df=playing_time_stats, conn=conn, squads=squads
+    )
+
+    # Creating/Updating the miscellaneous_stats table  in the football-db database
+    pushSquadsToDB(
+        table_name="miscellaneous_stats",
+        df=miscellaneous_stats,
+        conn=conn,
+        squads=squads,
+    )
+
+    # Creating/Updating the scores_and_fixtures table  in the football-db database
+    pushToDB(table_name="scores_and_fixtures", df=raw_scores_and_fixtures, conn=conn)
+
+    # Close the connection
+    conn.close()
+
+    print("Data Loading Phase Ended....")
@@ -3,9 +3,13 @@
 from airflow import DAG
 
 # Importing datetime and timedelta modules for scheduling the DAGs
-from datetime import datetime
+from datetime import datetime, timedelta
+
+# Importing the fixture based refresh selection, copied next to this DAG
+from fixture_schedule import select_squads
 
 # Importing operators
+from airflow.operators.python import ShortCircuitOperator
 from airflow.providers.cncf.kubernetes.operators.kubernetes_pod import (
     KubernetesPodOperator,
 )
@@ -20,14 +24,69 @@ env_vars = {
     "port": "5432",
 }
 
+# How often the DAG checks the fixtures for finished matches. With the
+# KubernetesExecutor every check starts its own worker pod and queries the DB,
+# only the ETL pods are skipped when no match has finished.
+FIXTURES_CHECK_INTERVAL = timedelta(minutes=10)
+
+
+def get_finished_squads(ti, data_interval_end):
+    """
+    Reads the kickoff times from the scores_and_fixtures table and finds the
+    squads whose matches have reached full time but have no stored score yet.
+    Matches stay selected on every check until their result has been loaded.
+
+    The squads are pushed to XCom under the "squads" key for the ETL job.
+
+    Args:
+        ti (airflow.models.TaskInstance): Running task instance.
+        data_interval_end (pendulum.DateTime): End of the DAG run's data interval.
+
+    Returns:
+        str: Comma separated squads that played, "all" if the fixtures have not
+        been loaded within FIXTURES_MAX_AGE, or an empty string (skipping the
+        refresh) if no match finished. See fixture_schedule.select_squads.
+    """
+    # Imported here as they are only needed when the check runs
+    import pandas as pd
+    from sqlalchemy import create_engine, inspect
+
+    db = create_engine(
+        "postgresql://{user}:{password}@{host}:{port}/{database}".format(**env_vars)
+    )
+    with db.connect() as conn:
+        # First deployment, nothing has been loaded yet
+        if not inspect(conn).has_table("scores_and_fixtures"):
+            print("scores_and_fixtures does not exist yet, refreshing all squads....")
+            ti.xcom_push(key="squads", value="all")
+            return "all"
+
+        fixtures = pd.read_sql_query(sql="SELECT * FROM scores_and_fixtures", con=conn)
+
+    squads = select_squads(fixtures=fixtures, now=pd.Timestamp(data_interval_end))
+
+    print(f"Squads to refresh: {squads}")
+    ti.xcom_push(key="squads", value=squads)
+    return squads
+
+
 # Step 3: Creating DAG Object
 dag = DAG(
     dag_id="PremierLeagueStatsAndRatings",
     start_date=datetime(2023, 6, 19),
-    schedule_interval="@once",
+    schedule_interval=FIXTURES_CHECK_INTERVAL,
+    catchup=False,
+    max_active_runs=1,
 )
 
 # Step 4: Creating task
+# Creating fixtures check task, skips the rest of the run if no match has finished
+check = ShortCircuitOperator(
+    task_id="CheckFinishedMatches",
+    python_callable=get_finished_squads,
+    dag=dag,
+)
+
 # Creating first task
 start = KubernetesPodOperator(
     task_id="ScrapeData",
@@ -35,7 +94,10 @@ start = KubernetesPodOperator(
     namespace="default",
     image="football_viz",
     image_pull_policy="IfNotPresent",
-    env_vars=env_vars,
+    env_vars={
+        **env_vars,
+        "squads": "{{ ti.xcom_pull(task_ids='CheckFinishedMatches', key='squads') }}",
+    },
     cmds=["python", "job.py"],
     dag=dag,
 )
@@ -52,5 +114,17 @@ end = KubernetesPodOperator(
     dag=dag,
 )
 
+# Creating third task
+elo_ratings = KubernetesPodOperator(
+    task_id="CalculateEloRatings",
+    name="football-etl-job-calculate-elo-ratings",
+    namespace="default",
+    image="football_viz",
+    image_pull_policy="IfNotPresent",
+    env_vars=env_vars,
+    cmds=["python", "elo.py"],
+    dag=dag,
+)
+
 # Step 5: Setting up dependencies
-start >> end
+check >> start >> [end, elo_ratings]
@@ -0,0 +1,80 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# elo.py reads the database configurations on import
+for key in ["database", "user", "password", "host", "port"]:
+    os.environ.setdefault(key, "")
+
+import elo
+
+
+def sequential_elo(matches):
+    """
+    Reference Elo calculation rating one match at a time in kickoff order.
+
+    Args:
+        matches (pd.DataFrame): Played matches returned by parse_matches.
+
+    Returns:
+        dict: Final Elo rating of each squad.
+    """
+    ratings = {}
+    for row in matches.itertuples():
+        home = ratings.get(row.home, elo.INITIAL_ELO)
+        away = ratings.get(row.away, elo.INITIAL_ELO)
+        expected = 1 / (1 + 10 ** ((away - home - elo.HOME_ADVANTAGE) / 400))
+        result = np.sign(row.home_goals - row.away_goals) * 0.5 + 0.5
+        margin = np.log1p(abs(row.home_goals - row.away_goals)) + 1
+        change = elo.K_FACTOR * margin * (result - expected)
+        ratings[row.home] = home + change
+        ratings[row.away] = away - change
+    return ratings
+
+
+def fixtures(rows):
+    return pd.DataFrame(
+        rows, columns=["date", "time", "home", "score", "away", "xg", "xg.1"]
+    )
+
+
+def assert_matches_sequential(scores_and_fixtures):
+    matches = elo.parse_matches(scores_and_fixtures)
+    rated, state = elo.calculate_elo(matches)
+    expected = sequential_elo(matches)
+
+    ratings = state.set_index("squad")["elo"]
+    for squad, rating in expected.items():
+        assert np.isclose(ratings[squad], rating)
+
+    # Every squad's matches are rated in kickoff order
+    rated_order = rated[["date", "time"]].apply(tuple, axis=1)
+    for squad in expected:
+        played = rated_order[(rated["home"] == squad) | (rated["away"] == squad)]
+        assert played.is_monotonic_increasing
+
+
+def test_squad_playing_home_and_away_on_one_date():
+    assert_matches_sequential(
+        fixtures(
+            [
+                ["2023-08-12", "12:00", "A", "2–0", "B", 1.2, 0.4],
+                ["2023-08-12", "14:00", "A", "1–1", "D", 0.8, 0.9],
+                ["2023-08-12", "16:00", "C", "0–3", "A", 0.3, 2.1],
+            ]
+        )
+    )
+
+
+def test_random_history_with_repeats_on_one_date():
+    rng = np.random.default_rng(0)
+    squads = list("ABCDEFGH")
+    rows = []
+    for day in range(30):
+        date = str((pd.Timestamp("2023-08-01") + pd.Timedelta(days=day)).date())
+        for hour in range(12, 12 + rng.integers(1, 8)):
+            home, away = rng.choice(squads, size=2, replace=False)
+            score = f"{rng.integers(0, 5)}–{rng.integers(0, 5)}"
+            rows.append([date, f"{hour}:00", home, score, away, 1.0, 1.0])
+    assert_matches_sequential(fixtures(rows))
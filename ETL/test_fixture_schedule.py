@@ -0,0 +1,65 @@
+import pandas as pd
+
+from fixture_schedule import FULL_TIME_DELAY, get_full_time, select_squads
+
+
+def fixtures(rows, loaded_at="2023-08-12 10:00"):
+    df = pd.DataFrame(rows, columns=["date", "time", "home", "away", "score", "notes"])
+    df["loaded_at"] = pd.Timestamp(loaded_at, tz="UTC")
+    return df
+
+
+def utc(timestamp):
+    return pd.Timestamp(timestamp, tz="UTC")
+
+
+def test_full_time_keeps_venue_time_and_daylight_saving():
+    full_time = get_full_time(
+        fixtures(
+            [
+                ["2023-08-12", "17:30 (18:30)", "A", "B", None, None],
+                ["2023-12-02", "15:00", "C", "D", None, None],
+                ["2023-12-02", "", "E", "F", None, None],
+            ]
+        )
+    )
+
+    # British Summer Time in August, Greenwich Mean Time in December
+    assert full_time[0] == utc("2023-08-12 16:30") + FULL_TIME_DELAY
+    assert full_time[1] == utc("2023-12-02 15:00") + FULL_TIME_DELAY
+    assert pd.isna(full_time[2])
+
+
+def test_selects_finished_matches_without_a_score():
+    df = fixtures(
+        [
+            ["2023-08-12", "12:30", "Arsenal", "Forest", "2–1", None],
+            ["2023-08-12", "15:00", "Burnley", "Man City", None, None],
+            ["2023-08-12", "15:00", "Bournemouth", "West Ham", None, "Match Postponed"],
+            ["2023-08-12", "17:30", "Brighton", "Luton", None, None],
+        ]
+    )
+
+    # 15:00 BST kicks off at 14:00 UTC
+    assert select_squads(df, utc("2023-08-12 16:00")) == ""
+    assert select_squads(df, utc("2023-08-12 16:10")) == "burnley,man city"
+
+    # Retried until the score is loaded
+    assert select_squads(df, utc("2023-08-12 17:00")) == "burnley,man city"
+
+
+def test_ignores_matches_older_than_the_lookback():
+    df = fixtures(
+        [["2023-08-01", "15:00", "Burnley", "Man City", None, None]],
+        loaded_at="2023-08-12 10:00",
+    )
+    assert select_squads(df, utc("2023-08-12 16:10")) == ""
+
+
+def test_refreshes_all_squads_when_fixtures_are_stale():
+    df = fixtures(
+        [["2023-08-12", "15:00", "Burnley", "Man City", "0–3", None]],
+        loaded_at="2023-08-10 10:00",
+    )
+    assert select_squads(df, utc("2023-08-12 16:10")) == "all"
+    assert select_squads(df.drop(columns=["loaded_at"]), utc("2023-08-12")) == "all"
@@ -0,0 +1,67 @@
+import os
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+# job.py reads the database configurations on import
+for key in ["database", "user", "password", "host", "port"]:
+    os.environ.setdefault(key, "")
+
+import job
+
+
+def stats(goals):
+    return pd.DataFrame(
+        {
+            "Squad": ["Arsenal", "Burnley", "Chelsea", "Arsenal"],
+            "Value": ["squad", "squad", "squad", "opponent"],
+            "Gls": goals,
+        }
+    )
+
+
+def read_table(db):
+    return (
+        pd.read_sql_query(sql="SELECT * FROM shooting_stats", con=db)
+        .sort_values(["squad", "value"])
+        .reset_index(drop=True)
+    )
+
+
+def test_push_squads_replaces_only_their_rows(tmp_path):
+    db = create_engine(f"sqlite:///{tmp_path / 'football.db'}")
+    with db.connect() as conn:
+        job.pushSquadsToDB("shooting_stats", stats([1, 2, 3, 4]), conn, squads=[])
+    with db.connect() as conn:
+        job.pushSquadsToDB(
+            "shooting_stats", stats([10, 20, 30, 40]), conn, squads=["arsenal"]
+        )
+
+    table = read_table(db)
+    assert table["squad"].tolist() == ["arsenal", "arsenal", "burnley", "chelsea"]
+    assert table["gls"].tolist() == [40, 10, 2, 3]
+
+
+def test_push_squads_loads_every_squad_into_a_new_table(tmp_path):
+    db = create_engine(f"sqlite:///{tmp_path / 'football.db'}")
+    with db.connect() as conn:
+        job.pushSquadsToDB(
+            "shooting_stats", stats([1, 2, 3, 4]), conn, squads=["arsenal"]
+        )
+
+    assert read_table(db)["gls"].tolist() == [4, 1, 2, 3]
+
+
+def test_push_squads_replaces_every_squad_when_one_is_unknown(tmp_path):
+    db = create_engine(f"sqlite:///{tmp_path / 'football.db'}")
+    with db.connect() as conn:
+        job.pushSquadsToDB("shooting_stats", stats([1, 2, 3, 4]), conn, squads=[])
+    with db.connect() as conn:
+        job.pushSquadsToDB(
+            "shooting_stats",
+            stats([10, 20, 30, 40]),
+            conn,
+            squads=["arsenal", "nott'ham forest"],
+        )
+
+    assert read_table(db)["gls"].tolist() == [40, 10, 20, 30]